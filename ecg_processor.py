@@ -7,8 +7,8 @@ lead segmentation, and signal extraction.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
 import cv2
-import matplotlib.pyplot as plt
 
 from utils import ensure_directory_exists, to_grayscale, save_debug_image
 from grid_removal import remove_grid, remove_isolated_pixels
@@ -21,14 +21,36 @@ from signal_extraction import create_plot
 class ECGProcessor:
     """Process ECG images through a complete pipeline."""
 
-    def __init__(self, debug=True):
+    def __init__(self, debug=True, reuse_threshold=False):
         """
         Initialize ECG processor.
 
         Args:
             debug: Whether to save debug images and print extra information
+            reuse_threshold: Whether to reuse the Otsu threshold of the first
+                processed image for later ones (for batches of similar scans)
         """
         self.debug = debug
+        self.reuse_threshold = reuse_threshold
+        self._cached_threshold = None
+        self._io_pool = ThreadPoolExecutor(max_workers=2) if debug else None
+        self._pending_writes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Don't let a failed write hide the exception that ended the block
+        self.close(raise_errors=exc_type is None)
+
+    def close(self, raise_errors=True):
+        """Finish pending debug image writes and shut down the I/O pool."""
+        try:
+            self._wait_for_debug_images(raise_errors)
+        finally:
+            if self._io_pool is not None:
+                self._io_pool.shutdown()
+                self._io_pool = None
 
     def process(self, image_path, output_dir):
         """
@@ -45,18 +67,40 @@ class ECGProcessor:
         ensure_directory_exists(output_dir)
         debug_dir = os.path.join(output_dir, "debug") if self.debug else None
 
-        # Load and preprocess image
-        gray_image = self._load_and_convert_image(image_path, debug_dir)
+        try:
+            # Load and preprocess image
+            gray_image = self._load_and_convert_image(image_path, debug_dir)
 
-        # Process grid, text, and frame
-        cleaned_image = self._process_image_elements(gray_image, debug_dir)
+            # Process grid, text, and frame
+            cleaned_image = self._process_image_elements(gray_image, debug_dir)
 
-        # Segment leads and visualize results
-        figure = self._segment_and_visualize(cleaned_image, debug_dir, output_dir)
+            # Segment leads and visualize results
+            figure = self._segment_and_visualize(cleaned_image, debug_dir, output_dir)
+        except BaseException:
+            # Don't let a failed write hide the pipeline error
+            self._wait_for_debug_images(raise_errors=False)
+            raise
+
+        # Make sure all debug images are on disk before returning
+        self._wait_for_debug_images()
 
         print(f"ECG processing complete. Results saved in '{output_dir}'")
         return figure
 
+    def _save_debug_image(self, image, debug_dir, filename):
+        """Queue a debug image write on the I/O pool."""
+        future = save_debug_image(image, debug_dir, filename, self._io_pool)
+        if future is not None:
+            self._pending_writes.append(future)
+
+    def _wait_for_debug_images(self, raise_errors=True):
+        """Block until queued debug image writes have finished, optionally raising write errors."""
+        pending, self._pending_writes = self._pending_writes, []
+        wait(pending)
+        if raise_errors:
+            for future in pending:
+                future.result()
+
     def _load_and_convert_image(self, image_path, debug_dir):
         """Load image from path and convert to grayscale."""
         image = cv2.imread(image_path)
@@ -64,27 +108,29 @@ class ECGProcessor:
             raise ValueError(f"Unable to load image from {image_path}")
 
         gray_image = to_grayscale(image)
-        save_debug_image(gray_image, debug_dir, "01_original.png")
+        self._save_debug_image(gray_image, debug_dir, "01_original.png")
         return gray_image
 
     def _process_image_elements(self, gray_image, debug_dir):
         """Remove grid, text, and frame from the image."""
         # Remove grid
-        grid_removed = remove_grid(gray_image, debug_dir)
-        save_debug_image(grid_removed, debug_dir, "02_grid_removed.png")
+        grid_removed, threshold = remove_grid(gray_image, debug_dir, self._cached_threshold)
+        if self.reuse_threshold:
+            self._cached_threshold = threshold
+        self._save_debug_image(grid_removed, debug_dir, "02_grid_removed.png")
 
         # Remove text
         text_mask = create_text_mask(grid_removed, debug_dir)
-        text_removed = remove_text(grid_removed, text_mask)
-        save_debug_image(text_removed, debug_dir, "03_text_removed.png")
+        text_removed = remove_text(grid_removed, text_mask, out=grid_removed)
+        self._save_debug_image(text_removed, debug_dir, "03_text_removed.png")
 
         # Remove frame
         frame_removed = remove_frame(text_removed, debug_dir)
-        save_debug_image(frame_removed, debug_dir, "04_frame_removed.png")
+        self._save_debug_image(frame_removed, debug_dir, "04_frame_removed.png")
 
         # Clean isolated pixels
-        cleaned = remove_isolated_pixels(frame_removed)
-        save_debug_image(cleaned, debug_dir, "05_cleaned.png")
+        cleaned = remove_isolated_pixels(frame_removed, out=frame_removed)
+        self._save_debug_image(cleaned, debug_dir, "05_cleaned.png")
 
         return cleaned
 
@@ -1,39 +1,81 @@
 """Frame detection and removal from ECG images."""
 
-import cv2
 import numpy as np
 from utils import save_debug_image
 
 
-def detect_edges(image):
-    """Detect edges for frame detection."""
-    edges = cv2.Canny(image, 50, 150)
-    kernel = np.ones((3, 3), np.uint8)
-    return cv2.dilate(edges, kernel, iterations=1)
+def find_strongest_line(projection, start, stop, min_length):
+    """Return the index of the strongest line in a projection range, if long enough."""
+    index = start + int(np.argmax(projection[start:stop]))
+    return index if projection[index] >= min_length else None
 
 
-def find_largest_contour(edge_image):
-    """Find the largest contour in an edge image."""
-    contours, _ = cv2.findContours(edge_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+def line_extent(line):
+    """Return the first and last foreground index along a line."""
+    indices = np.flatnonzero(line)
+    return int(indices[0]), int(indices[-1])
 
-    if not contours:
-        return None
 
-    # Sort contours by area in descending order
-    return sorted(contours, key=cv2.contourArea, reverse=True)[0]
+def meets_edge_end(position, extents, end, tolerance):
+    """Check whether a line position meets the given end of any perpendicular edge."""
+    return any(abs(position - extent[end]) <= tolerance for extent in extents)
+
+
+def find_frame_by_projection(image, min_coverage=0.5, tolerance=5):
+    """
+    Find a rectangular frame from row and column projections of its lines.
+
+    Long flat traces also show up as projection peaks, so a line is only
+    kept as an edge where it meets the end of a perpendicular edge. Edges
+    erased by earlier steps (such as blanked text margins) are taken from
+    the extent of the kept perpendicular edges, so a frame needs at least
+    one horizontal and one vertical edge.
+    """
+    height, width = image.shape[:2]
+
+    # Frame lines share the polarity of the minority (foreground) pixels
+    foreground = image > 127 if np.mean(image) < 127 else image < 128
+    col_sum = np.count_nonzero(foreground, axis=0)
+    row_sum = np.count_nonzero(foreground, axis=1)
 
+    # Strongest vertical line in each half and horizontal line in each half
+    x0 = find_strongest_line(col_sum, 0, width // 2, min_coverage * height)
+    x1 = find_strongest_line(col_sum, width // 2, width, min_coverage * height)
+    y0 = find_strongest_line(row_sum, 0, height // 2, min_coverage * width)
+    y1 = find_strongest_line(row_sum, height // 2, height, min_coverage * width)
 
-def get_frame_rectangle(contour, min_area=100):
-    """Get a simplified rectangle from a contour representing a frame."""
-    if contour is None or cv2.contourArea(contour) <= min_area:
+    # Where the candidate lines start and end
+    col_extents = [line_extent(foreground[y]) for y in (y0, y1) if y is not None]
+    row_extents = [line_extent(foreground[:, x]) for x in (x0, x1) if x is not None]
+
+    # Keep only lines that close off a perpendicular edge
+    if x0 is not None and not meets_edge_end(x0, col_extents, 0, tolerance):
+        x0 = None
+    if x1 is not None and not meets_edge_end(x1, col_extents, 1, tolerance):
+        x1 = None
+    if y0 is not None and not meets_edge_end(y0, row_extents, 0, tolerance):
+        y0 = None
+    if y1 is not None and not meets_edge_end(y1, row_extents, 1, tolerance):
+        y1 = None
+
+    if (x0 is None and x1 is None) or (y0 is None and y1 is None):
         return None
 
-    # Approximate the contour to get a simpler polygon
-    epsilon = 0.01 * cv2.arcLength(contour, True)
-    approx = cv2.approxPolyDP(contour, epsilon, True)
+    # Fill in missing edges from where the kept edges end
+    vertical_edge = x0 if x0 is not None else x1
+    horizontal_edge = y0 if y0 is not None else y1
+
+    if x0 is None or x1 is None:
+        first, last = line_extent(foreground[horizontal_edge])
+        x0 = first if x0 is None else x0
+        x1 = last if x1 is None else x1
 
-    # Get the bounding rectangle
-    return cv2.boundingRect(approx)
+    if y0 is None or y1 is None:
+        first, last = line_extent(foreground[:, vertical_edge])
+        y0 = first if y0 is None else y0
+        y1 = last if y1 is None else y1
+
+    return x0, y0, x1 - x0, y1 - y0
 
 
 def crop_to_frame_interior(image, rect, margin=10):
@@ -84,13 +126,8 @@ def apply_margin_crop(image, margin_percent=0.05):
 def remove_frame(image, output_dir=None):
     """Detect and remove rectangular frame from an ECG image."""
     try:
-        # Detect edges for frame finding
-        dilated_edges = detect_edges(image)
-        save_debug_image(dilated_edges, output_dir, "dilated_edges.png")
-
-        # Find and process the largest contour
-        largest_contour = find_largest_contour(dilated_edges)
-        rect = get_frame_rectangle(largest_contour)
+        # Find frame edges from image projections
+        rect = find_frame_by_projection(image)
 
         if rect is not None:
             # Get dimensions
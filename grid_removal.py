@@ -2,61 +2,54 @@
 
 import cv2
 import numpy as np
-from utils import save_debug_image
+from utils import save_debug_image, copy_to
 
-def apply_morphological_filtering(image, output_dir=None):
-    """Apply morphological operations to remove grid."""
+def apply_morphological_filtering(image, output_dir=None, threshold=None):
+    """
+    Apply morphological operations to remove grid.
+
+    Uses Otsu's method unless a fixed threshold is given. Returns the
+    filtered image together with the threshold that was applied.
+    """
     kernel_open = np.ones((3, 3), np.uint8)
     morph_open = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel_open)
 
-    # Threshold using Otsu's method
-    _, morph_thresh = cv2.threshold(
-        morph_open, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
-    )
+    if threshold is None:
+        # Threshold using Otsu's method
+        threshold, morph_thresh = cv2.threshold(
+            morph_open, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
+        )
+    else:
+        _, morph_thresh = cv2.threshold(morph_open, threshold, 255, cv2.THRESH_BINARY_INV)
 
     save_debug_image(morph_thresh, output_dir, "morph_filtered.png")
-    return morph_thresh
+    return morph_thresh, threshold
 
 
-def remove_isolated_pixels(image, connectivity=8, min_connections=1):
+def remove_isolated_pixels(image, connectivity=8, min_connections=1, out=None):
     """Remove isolated pixels while preserving trace lines."""
-    cleaned = image.copy()
-    height, width = image.shape
-
-    # Define neighbor offsets based on connectivity
+    # Neighbor kernel based on connectivity (center excluded)
     if connectivity == 8:
-        neighbor_offsets = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1), (0, 1),
-            (1, -1), (1, 0), (1, 1)
-        ]
+        kernel = np.array([[1, 1, 1],
+                           [1, 0, 1],
+                           [1, 1, 1]], np.float32)
     else:  # 4-way connectivity
-        neighbor_offsets = [
-            (-1, 0), (0, -1), (0, 1), (1, 0)
-        ]
-
-    # Find white pixels
-    white_pixels = np.where(image == 255)
-    coordinates = list(zip(white_pixels[0], white_pixels[1]))
-
-    # Check each white pixel
-    for y, x in coordinates:
-        white_neighbors = 0
-
-        for dy, dx in neighbor_offsets:
-            ny, nx = y + dy, x + dx
+        kernel = np.array([[0, 1, 0],
+                           [1, 0, 1],
+                           [0, 1, 0]], np.float32)
 
-            if 0 <= ny < height and 0 <= nx < width and image[ny, nx] == 255:
-                white_neighbors += 1
+    # Count white neighbors of every pixel with a single convolution
+    white = (image == 255).astype(np.uint8)
+    neighbor_count = cv2.filter2D(white, cv2.CV_16S, kernel, borderType=cv2.BORDER_CONSTANT)
 
-        # Remove pixels with fewer connections than required
-        if white_neighbors < min_connections:
-            cleaned[y, x] = 0
+    # Remove pixels with fewer connections than required
+    cleaned = copy_to(image, out)
+    cleaned[(white == 1) & (neighbor_count < min_connections)] = 0
 
     return cleaned
 
 
-def remove_grid(image, output_dir=None):
+def remove_grid(image, output_dir=None, threshold=None):
     """Apply multiple methods to remove grid from ECG image."""
     save_debug_image(image, output_dir, "original_gray.png")
-    return apply_morphological_filtering(image, output_dir)
\ No newline at end of file
+    return apply_morphological_filtering(image, output_dir, threshold)
\ No newline at end of file
@@ -1,52 +1,44 @@
 """ECG lead segmentation functionality."""
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.cluster import DBSCAN
-from utils import ensure_white_signal_on_black_background, binarize_image
+from utils import ensure_white_signal_on_black_background, binarize_image, load_pyplot
 
 
 def find_signal_points(binary_image):
     """Identify all signal points across the image."""
     height, width = binary_image.shape
-    all_signal_points = []
 
-    for col in range(width):
-        # Find all white pixels in this column
-        white_pixels = np.where(binary_image[:, col] > 0)[0]
+    # Lay columns out contiguously, with a zero separator so runs never span columns
+    columns = np.zeros((width, height + 1), np.int8)
+    columns[:, :height] = binary_image.T > 0
 
-        # Group adjacent pixels to find signal points
-        if len(white_pixels) > 0:
-            groups = []
-            current_group = [white_pixels[0]]
+    # Run starts and ends from 0->1 and 1->0 transitions
+    transitions = np.diff(columns.ravel(), prepend=np.int8(0))
+    starts = np.flatnonzero(transitions == 1)
+    ends = np.flatnonzero(transitions == -1)
 
-            for i in range(1, len(white_pixels)):
-                if white_pixels[i] - white_pixels[i - 1] <= 1:
-                    current_group.append(white_pixels[i])
-                else:
-                    signal_y = int(np.median(current_group))
-                    all_signal_points.append(signal_y)
-                    current_group = [white_pixels[i]]
+    # Midpoint of each run (the median of its contiguous rows), mapped back to its row index
+    return (starts + ends - 1) // 2 % (height + 1)
 
-            # Add the last group
-            if current_group:
-                signal_y = int(np.median(current_group))
-                all_signal_points.append(signal_y)
 
-    return all_signal_points
+def cluster_lead_positions(signal_points, eps=10, min_samples=3):
+    """Cluster signal points to identify lead positions."""
+    if len(signal_points) == 0:
+        return []
 
+    # Count signal points per row
+    counts = np.bincount(np.asarray(signal_points, dtype=np.int64))
+    rows = np.flatnonzero(counts)
 
-def cluster_lead_positions(signal_points, eps=10):
-    """Cluster signal points to identify lead positions."""
-    X = np.array(signal_points).reshape(-1, 1)
-    clustering = DBSCAN(eps=eps, min_samples=3).fit(X)
+    # Split occupied rows into clusters wherever the gap exceeds eps
+    clusters = np.split(rows, np.flatnonzero(np.diff(rows) > eps) + 1)
 
-    # Extract cluster centers (lead positions)
+    # Extract cluster centers (lead positions), skipping sparse clusters as noise
     lead_positions = []
-    for label in set(clustering.labels_):
-        if label != -1:  # Skip noise points
-            cluster_points = X[clustering.labels_ == label]
-            lead_positions.append(np.median(cluster_points))
+    for cluster_rows in clusters:
+        cluster_counts = counts[cluster_rows]
+        if cluster_counts.sum() >= min_samples:
+            lead_positions.append(np.median(np.repeat(cluster_rows, cluster_counts)))
 
     return sorted(lead_positions)
 
@@ -79,6 +71,7 @@ def adjust_to_expected_lead_count(lead_boundaries, expected_leads=12):
 
 def visualize_segmentation(binary_image, lead_positions, lead_boundaries):
     """Visualize segmentation results."""
+    plt = load_pyplot()
     plt.figure(figsize=(12, 10))
     plt.imshow(binary_image, cmap='gray')
 
@@ -101,7 +94,10 @@ def segment_leads(image, debug=True, eps=10, expected_leads=12):
     """Segment ECG image into leads."""
     # Ensure consistent image format
     image_processed = ensure_white_signal_on_black_background(image)
-    binary_image = binarize_image(image_processed)
+
+    # Binarize in place only if we own the buffer
+    owned = image_processed is not image
+    binary_image = binarize_image(image_processed, out=image_processed if owned else None)
     height, width = binary_image.shape
 
     # Find signal points
@@ -5,12 +5,16 @@ Usage:
     python main.py <input_image> <output_directory>
 """
 
+import os
 import sys
 from ecg_processor import ECGProcessor
 
 
 def main():
     """Entry point for ECG processing application."""
+    # The CLI only saves figures, so default to the non-interactive backend
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
     if len(sys.argv) < 3:
         print("Usage: python main.py <input_image> <output_directory>")
         sys.exit(1)
@@ -20,10 +24,9 @@ def main():
 
     try:
         # Create processor with debug enabled
-        processor = ECGProcessor(debug=True)
-
-        # Process the ECG image
-        processor.process(input_image_path, output_dir)
+        with ECGProcessor(debug=True) as processor:
+            # Process the ECG image
+            processor.process(input_image_path, output_dir)
 
         print("Processing completed successfully.")
     except Exception as e:
@@ -1,7 +1,9 @@
 """Extract ECG signal from segmented leads."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
+from utils import load_pyplot
 
 
 def extract_lead_boundaries(binary_image, y_start, y_end, baseline_y=None):
@@ -24,77 +26,55 @@ def extract_lead_boundaries(binary_image, y_start, y_end, baseline_y=None):
     else:
         baseline_y = baseline_y - y_start  # Make relative to segment
 
-    # Initialize arrays for boundary points
-    x_upper = []
-    y_upper = []
-    x_lower = []
-    y_lower = []
-
-    # Process each column
-    for x in range(width):
-        # Find white pixels in this column
-        white_pixels = np.where(lead_img[:, x] > 0)[0]
-
-        if len(white_pixels) > 0:
-            if len(white_pixels) > 1:
-                # Keep topmost and bottommost pixels
-                top_y = np.min(white_pixels)
-                bottom_y = np.max(white_pixels)
-
-                # Add to upper boundary (convert to amplitude)
-                x_upper.append(x)
-                y_upper.append(baseline_y - top_y)
-
-                # Add to lower boundary
-                x_lower.append(x)
-                y_lower.append(baseline_y - bottom_y)
-            else:
-                # Single pixel case
-                y = white_pixels[0]
-                amplitude = baseline_y - y
-
-                if amplitude >= 0:  # Above baseline
-                    x_upper.append(x)
-                    y_upper.append(amplitude)
-                else:  # Below baseline
-                    x_lower.append(x)
-                    y_lower.append(amplitude)
-
-    # Convert to arrays and sort by x-coordinate
-    upper_boundary = sort_boundary_points(x_upper, y_upper)
-    lower_boundary = sort_boundary_points(x_lower, y_lower)
+    # Empty segment has no boundary points
+    if lead_img.shape[0] == 0:
+        empty = (np.array([]), np.array([]))
+        return empty, empty, lead_height
 
-    return upper_boundary, lower_boundary, lead_height
+    # Topmost and bottommost white pixel of every column
+    lead_mask = lead_img if lead_img.dtype == bool else lead_img > 0
+    has_pixels = lead_mask.any(axis=0)
+    top_y = lead_mask.argmax(axis=0)
+    bottom_y = lead_mask.shape[0] - 1 - lead_mask[::-1].argmax(axis=0)
+
+    # Convert to amplitude relative to baseline
+    top_amplitude = baseline_y - top_y
+    bottom_amplitude = baseline_y - bottom_y
 
+    # Single pixel columns go to one boundary depending on side of baseline
+    single_pixel = top_y == bottom_y
+    upper_mask = has_pixels & (~single_pixel | (top_amplitude >= 0))
+    lower_mask = has_pixels & (~single_pixel | (bottom_amplitude < 0))
 
-def sort_boundary_points(x_points, y_points):
-    """Sort boundary points by x-coordinate."""
-    if not x_points:
-        return np.array([]), np.array([])
+    # Columns come out of flatnonzero already sorted by x-coordinate
+    upper_boundary = (np.flatnonzero(upper_mask), top_amplitude[upper_mask])
+    lower_boundary = (np.flatnonzero(lower_mask), bottom_amplitude[lower_mask])
+
+    return upper_boundary, lower_boundary, lead_height
 
-    # Convert to numpy arrays
-    x_array = np.array(x_points)
-    y_array = np.array(y_points)
 
-    # Sort by x-coordinate
-    sort_idx = np.argsort(x_array)
-    x_sorted = x_array[sort_idx]
-    y_sorted = y_array[sort_idx]
+def thin_boundary_points(boundary, max_points):
+    """Subsample boundary points so there are at most max_points of them."""
+    x_points, y_points = boundary
+    stride = -(-len(x_points) // max_points)  # Ceiling division
 
-    return x_sorted, y_sorted
+    if stride <= 1:
+        return boundary
+    return x_points[::stride], y_points[::stride]
 
 
-def plot_lead(ax, upper_boundary, lower_boundary, lead_height, lead_label, debug=False):
+def plot_lead(ax, upper_boundary, lower_boundary, lead_height, lead_label, debug=False,
+              max_points=15 * 300):
     """Plot a single lead on the provided axis."""
     x_upper, y_upper = upper_boundary
     x_lower, y_lower = lower_boundary
 
-    # Plot boundaries
+    # Plot boundaries (more points than output pixels only slows rendering)
     if len(x_upper) > 0:
-        ax.plot(x_upper, y_upper, 'k-', linewidth=1)
+        ax.plot(*thin_boundary_points(upper_boundary, max_points), 'k-', linewidth=1, rasterized=True)
 
     if len(x_lower) > 0:
-        ax.plot(x_lower, y_lower, 'k-', linewidth=1)
+        ax.plot(*thin_boundary_points(lower_boundary, max_points), 'k-', linewidth=1, rasterized=True)
 
     # Set title
     ax.set_title(lead_label, fontweight='bold')
@@ -121,8 +101,9 @@ def plot_lead(ax, upper_boundary, lower_boundary, lead_height, lead_label, debug
                 bbox=dict(facecolor='white', alpha=0.7))
 
 
-def create_plot(binary_image, lead_boundaries, lead_positions, debug=False):
+def create_plot(binary_image, lead_boundaries, lead_positions, debug=False, max_points=15 * 300):
     """Create plot with all ECG leads."""
+    plt = load_pyplot()
     lead_count = len(lead_boundaries) - 1
 
     # Create figure with subplots
@@ -133,25 +114,28 @@ def create_plot(binary_image, lead_boundaries, lead_positions, debug=False):
     # Lead names
     lead_names = ['I', 'II', 'III', 'aVR', 'aVL', 'aVF', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
 
-    # Process each lead
-    for i in range(lead_count):
-        # Get lead boundaries
-        y_start = lead_boundaries[i]
-        y_end = lead_boundaries[i + 1]
+    # Threshold the whole image once and share it across leads
+    signal_mask = binary_image > 0
 
-        # Get baseline (lead position)
-        baseline_y = lead_positions[i] if i < len(lead_positions) else None
+    # Baseline (lead position) for each lead
+    baselines = [lead_positions[i] if i < len(lead_positions) else None for i in range(lead_count)]
 
-        # Extract boundary points
-        upper_boundary, lower_boundary, lead_height = extract_lead_boundaries(
-            binary_image, y_start, y_end, baseline_y
-        )
+    # Extract boundary points of all leads in parallel (NumPy releases the GIL)
+    with ThreadPoolExecutor(max_workers=min(lead_count, os.cpu_count() or 1) or 1) as executor:
+        extracted = list(executor.map(
+            lambda i: extract_lead_boundaries(
+                signal_mask, lead_boundaries[i], lead_boundaries[i + 1], baselines[i]
+            ),
+            range(lead_count)
+        ))
 
+    # Plot each lead on the main thread
+    for i, (upper_boundary, lower_boundary, lead_height) in enumerate(extracted):
         # Get lead label
         lead_label = lead_names[i] if i < len(lead_names) else f'Lead {i + 1}'
 
         # Plot this lead
-        plot_lead(axes[i], upper_boundary, lower_boundary, lead_height, lead_label, debug)
+        plot_lead(axes[i], upper_boundary, lower_boundary, lead_height, lead_label, debug, max_points)
 
     # Add x-axis label to bottom plot
     axes[-1].set_xlabel('Sample (pixel column)')
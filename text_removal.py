@@ -2,7 +2,7 @@
 
 import cv2
 import numpy as np
-from utils import save_debug_image
+from utils import save_debug_image, copy_to
 
 
 def create_margin_mask(image, left_margin_percent=0.1, bottom_margin_percent=0.05):
@@ -24,7 +24,6 @@ def create_margin_mask(image, left_margin_percent=0.1, bottom_margin_percent=0.0
 def find_text_by_connected_components(image):
     """Find text elements using connected component analysis."""
     height, width = image.shape
-    text_mask = np.zeros_like(image)
 
     # Invert the image (text is typically white on dark background)
     inverted = cv2.bitwise_not(image)
@@ -38,7 +37,7 @@ def find_text_by_connected_components(image):
     )
 
     if num_labels <= 1:  # No components found
-        return text_mask
+        return np.zeros_like(image)
 
     # Analyze component sizes
     areas = stats[1:, cv2.CC_STAT_AREA]  # Skip background (label 0)
@@ -50,17 +49,13 @@ def find_text_by_connected_components(image):
     max_text_height = height // 15
 
     # Mark components likely to be text
-    for i in range(1, num_labels):
-        area = stats[i, cv2.CC_STAT_AREA]
-        width_component = stats[i, cv2.CC_STAT_WIDTH]
-        height_component = stats[i, cv2.CC_STAT_HEIGHT]
+    is_text = ((stats[:, cv2.CC_STAT_AREA] < small_threshold) &
+               (stats[:, cv2.CC_STAT_WIDTH] < max_text_width) &
+               (stats[:, cv2.CC_STAT_HEIGHT] < max_text_height))
+    is_text[0] = False  # Never mark background
 
-        if (area < small_threshold and
-                width_component < max_text_width and
-                height_component < max_text_height):
-            text_mask[labels == i] = 255
-
-    return text_mask
+    # Look up every pixel's label in a single pass
+    return np.where(is_text[labels], np.uint8(255), np.uint8(0))
 
 
 def create_text_mask(image, output_dir=None):
@@ -74,21 +69,21 @@ def create_text_mask(image, output_dir=None):
         cc_text_mask = find_text_by_connected_components(image)
         save_debug_image(cc_text_mask, output_dir, "cc_text_mask.png")
 
-        # Combine masks
-        text_mask = cv2.bitwise_or(text_mask, cc_text_mask)
+        # Combine masks in place
+        np.bitwise_or(text_mask, cc_text_mask, out=text_mask)
     except Exception as e:
         print(f"Warning: Connected component analysis failed: {str(e)}")
 
     # Dilate to ensure complete coverage
     kernel = np.ones((3, 3), np.uint8)
-    text_mask = cv2.dilate(text_mask, kernel, iterations=1)
+    cv2.dilate(text_mask, kernel, dst=text_mask, iterations=1)
 
     save_debug_image(text_mask, output_dir, "final_text_mask.png")
     return text_mask
 
 
-def remove_text(image, text_mask):
+def remove_text(image, text_mask, out=None):
     """Remove text from the image using the provided text mask."""
-    cleaned = image.copy()
+    cleaned = copy_to(image, out)
     cleaned[text_mask > 0] = 0  # Replace text with black
     return cleaned
\ No newline at end of file
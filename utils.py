@@ -11,28 +11,62 @@ def ensure_directory_exists(directory):
         os.makedirs(directory)
 
 
-def save_debug_image(image, output_dir, filename):
-    """Save image to output directory for debugging."""
+# Debug images favour fast encoding over file size
+DEBUG_IMAGE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+def save_debug_image(image, output_dir, filename, executor=None):
+    """Save image to output directory for debugging, optionally in the background."""
     if output_dir:
         ensure_directory_exists(output_dir)
-        cv2.imwrite(os.path.join(output_dir, filename), image)
+        path = os.path.join(output_dir, filename)
+
+        if executor is not None:
+            # Copy so later in-place processing doesn't change what gets written
+            return executor.submit(cv2.imwrite, path, image.copy(), DEBUG_IMAGE_PARAMS)
+
+        cv2.imwrite(path, image, DEBUG_IMAGE_PARAMS)
+    return None
+
 
+def copy_to(image, out=None):
+    """Copy image into out, or into a new array if out is not given."""
+    if out is None:
+        return image.copy()
+    if out is not image:
+        np.copyto(out, image)
+    return out
 
-def to_grayscale(image):
+
+def load_pyplot():
+    """Import pyplot on first use, keeping whatever backend the caller chose."""
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def to_grayscale(image, out=None):
     """Convert image to grayscale if it's not already."""
     if len(image.shape) == 3:
-        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    return image.copy()
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
+    return copy_to(image, out)
+
 
+def ensure_white_signal_on_black_background(image, out=None):
+    """
+    Ensure image has white signal on black background.
 
-def ensure_white_signal_on_black_background(image):
-    """Ensure image has white signal on black background."""
-    if np.mean(image) > 127:
-        return 255 - image
-    return image.copy()
+    Without out, an image that is already correct is returned as is, not
+    copied, so callers must not modify the result in place.
+    """
+    # A sparse sample is enough to decide the polarity
+    if np.mean(image[::8, ::8]) > 127:
+        return np.subtract(255, image, out=out, dtype=image.dtype)
+    if out is None:
+        return image
+    return copy_to(image, out)
 
 
-def binarize_image(image, threshold=127):
+def binarize_image(image, threshold=127, out=None):
     """Convert grayscale image to binary using threshold."""
-    _, binary = cv2.threshold(image, threshold, 255, cv2.THRESH_BINARY)
+    _, binary = cv2.threshold(image, threshold, 255, cv2.THRESH_BINARY, dst=out)
     return binary
\ No newline at end of file